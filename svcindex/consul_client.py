@@ -18,10 +18,15 @@ def _headers() -> Dict[str, str]:
         h["X-Consul-Token"] = tok
     return h
 
-def get_json(path: str, params: Optional[Dict[str, Any]] = None, base: Optional[str] = None) -> Any:
+def get_json(
+    path: str,
+    params: Optional[Dict[str, Any]] = None,
+    base: Optional[str] = None,
+    timeout: float = 3,
+) -> Any:
     base_url = (base or consul_addr()).rstrip("/")
     url = f"{base_url}{path}"
-    r = requests.get(url, params=params, headers=_headers(), timeout=3)
+    r = requests.get(url, params=params, headers=_headers(), timeout=timeout)
     r.raise_for_status()
     return r.json()
 
@@ -0,0 +1,348 @@
+from __future__ import annotations
+
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass, replace
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+import requests
+
+from .util import Service, Monitor, now_ts
+from .consul_client import get_json, consul_addr
+
+SOURCE_KINDS = ("consul", "agent")
+
+@dataclass
+class Source:
+    kind: str            # consul | agent
+    url: str
+    dc: str = ""         # consul only: datacenter to query (empty = server's own)
+
+    @property
+    def name(self) -> str:
+        return f"{self.kind}:{self.url}" + (f"#{self.dc}" if self.dc else "")
+
+@dataclass
+class SourceState:
+    name: str
+    kind: str
+    ok: bool = False
+    stale: bool = True
+    last_ok: float = 0.0
+    last_attempt: float = 0.0
+    count: int = 0
+    error: str = ""
+
+    @property
+    def age_s(self) -> Optional[int]:
+        if not self.last_ok:
+            return None
+        return int(now_ts() - self.last_ok)
+
+    @property
+    def pending(self) -> bool:
+        """True until the first fetch has either succeeded or failed."""
+        return not self.last_ok and not self.error
+
+    @property
+    def status(self) -> str:
+        if self.pending:
+            return "pending"
+        return "stale" if self.stale else "ok"
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "kind": self.kind,
+            "status": self.status,
+            "ok": self.ok,
+            "stale": self.stale,
+            "age_s": self.age_s,
+            "count": self.count,
+            "error": self.error,
+        }
+
+def parse_source(spec: str) -> Source:
+    """Parses `KIND:URL[#DC]`, e.g. `consul:http://10.0.0.1:8500#dc2` or `agent:http://nas:8080`.
+
+    A bare URL (no kind prefix) is treated as a Consul source.
+    """
+    spec = spec.strip()
+    kind, sep, rest = spec.partition(":")
+    if not sep or kind not in SOURCE_KINDS:
+        kind, rest = "consul", spec
+    dc = ""
+    if "#" in rest:
+        rest, dc = rest.split("#", 1)
+    url = rest.strip().rstrip("/")
+    if not url:
+        raise ValueError(f"Source missing URL ({spec!r})")
+    if "://" not in url:
+        url = f"http://{url}"
+    # catches `consul:8500` / `agent:8080`, which would otherwise become http://8500
+    host = urlsplit(url).hostname
+    if not host or host.isdigit():
+        raise ValueError(f"Source has no host ({spec!r}); use KIND:http://HOST:PORT")
+    if kind == "agent" and dc:
+        raise ValueError(f"Datacenter only applies to consul sources ({spec!r})")
+    return Source(kind=kind, url=url, dc=dc.strip())
+
+def fetch_source(src: Source, timeout: float = 3) -> List[Service]:
+    """Fetches all services from one source within `timeout` seconds overall.
+
+    Raises if the source itself is unreachable or too slow.
+    """
+    if src.kind == "agent":
+        items = discover_from_agent(src.url, timeout=timeout)
+    else:
+        items = discover_from_consul(base=src.url, dc=src.dc, timeout=timeout)
+    for s in items:
+        s.source = src.name
+    return items
+
+def _fetch_timed(src: Source, timeout: float) -> Tuple[float, List[Service]]:
+    items = fetch_source(src, timeout=timeout)
+    return now_ts(), items
+
+class HubAggregator:
+    """Refreshes several sources concurrently and merges them into one view.
+
+    Each refresh waits at most `timeout` seconds. Results are stored as soon as
+    a fetch finishes, even if that is after the refresh stopped waiting. A
+    source that fails, or has had no success since the previous refresh while
+    its current fetch is over budget, keeps serving its last good result,
+    flagged as stale. A source whose previous fetch is still running is not
+    fetched again until it finishes, so a hung site never piles up threads.
+    """
+
+    def __init__(self, sources: List[Source], timeout: float = 5):
+        self.sources = list(sources)
+        self.timeout = timeout
+        self._pool = ThreadPoolExecutor(max_workers=max(1, len(self.sources)), thread_name_prefix="svcindex-hub")
+        self._pending: Dict[str, Tuple[float, Future]] = {}
+        self._results: Dict[str, List[Service]] = {}
+        self._states: Dict[str, SourceState] = {
+            src.name: SourceState(name=src.name, kind=src.kind) for src in self.sources
+        }
+        self._last_round = 0.0
+        self._lock = threading.Lock()
+
+    def refresh(self) -> List[Service]:
+        round_start = now_ts()
+        for src in self.sources:
+            started, fut = self._pending.get(src.name, (0.0, None))
+            if fut is None or fut.done():
+                self._states[src.name].last_attempt = round_start
+                fut = self._pool.submit(_fetch_timed, src, self.timeout)
+                self._pending[src.name] = (round_start, fut)
+                fut.add_done_callback(lambda f, src=src: self._on_done(src, f))
+
+        wait([fut for _, fut in self._pending.values()], timeout=self.timeout)
+
+        now = now_ts()
+        with self._lock:
+            for src in self.sources:
+                started, fut = self._pending[src.name]
+                st = self._states[src.name]
+                if fut.done() or now - started < self.timeout:
+                    continue
+                if st.last_ok >= self._last_round > 0:
+                    # slow but alive: a success landed since the previous round
+                    continue
+                st.ok = False
+                st.stale = True
+                st.error = f"timed out after {self.timeout:g}s"
+        self._last_round = round_start
+        return self.services()
+
+    def services(self) -> List[Service]:
+        """Merged view of all sources.
+
+        Entries from one source are all kept. Across sources, the same instance
+        (same `instance`, and same datacenter where both know it) is shown
+        once: fresh beats stale, then the first source (in CLI order) wins.
+        """
+        with self._lock:
+            ranked = sorted(
+                enumerate(self.sources),
+                key=lambda iv: (self._states[iv[1].name].stale, iv[0]),
+            )
+            stale_by = {src.name: self._states[src.name].stale for src in self.sources}
+            results = {src.name: list(self._results.get(src.name, [])) for src in self.sources}
+
+        out: List[Service] = []
+        seen: Dict[str, List[Tuple[str, str]]] = {}  # instance -> [(source, datacenter)]
+        for _, src in ranked:
+            for s in results[src.name]:
+                if s.instance and any(
+                    other != src.name and (not dc or not s.datacenter or dc == s.datacenter)
+                    for other, dc in seen.get(s.instance, [])
+                ):
+                    continue
+                if s.instance:
+                    seen.setdefault(s.instance, []).append((src.name, s.datacenter))
+                out.append(replace(s, stale=True) if stale_by[src.name] else s)
+        return out
+
+    def states(self) -> List[SourceState]:
+        with self._lock:
+            return [replace(self._states[src.name]) for src in self.sources]
+
+    def _on_done(self, src: Source, fut: Future) -> None:
+        try:
+            finished, items = fut.result()
+        except Exception as e:
+            with self._lock:
+                st = self._states[src.name]
+                st.ok = False
+                st.stale = True
+                st.error = (str(e) or e.__class__.__name__)[:120]
+            return
+        with self._lock:
+            self._results[src.name] = items
+            st = self._states[src.name]
+            st.ok = True
+            st.stale = False
+            st.last_ok = finished
+            st.count = len(items)
+            st.error = ""
+
+def discover_from_agent(base: str, timeout: float = 3) -> List[Service]:
+    """Reads the JSON snapshot an svcindex agent serves at /api/services."""
+    r = requests.get(f"{base.rstrip('/')}/api/services", timeout=timeout)
+    r.raise_for_status()
+    data = r.json() or {}
+    node = data.get("node") or "unknown"
+
+    out: List[Service] = []
+    for d in data.get("services") or []:
+        if not isinstance(d, dict) or not d.get("name"):
+            continue
+        m = d.get("monitor") or {}
+        s = Service(
+            name=f"{d['name']} @ {node}",
+            type=str(d.get("type") or "other"),
+            url=str(d.get("url") or ""),
+            description=str(d.get("description") or ""),
+            tags=[str(t) for t in d.get("tags") or []],
+            monitor=Monitor(
+                mode=str(m.get("mode") or "none"),
+                target=m.get("target"),
+                interval_s=int(m.get("interval_s") or 30),
+                timeout_s=int(m.get("timeout_s") or 2),
+            ),
+        )
+        s.status = str(d.get("status") or "unknown")
+        s.last_checked = float(d.get("last_checked") or 0.0)
+        s.latency_ms = d.get("latency_ms")
+        s.detail = str(d.get("detail") or "")[:120]
+        # same ID consul_sync registers, so the consul copy of this service matches
+        s.instance = f"{node}::{d['name']}"
+        out.append(s)
+    return out
+
+def discover_from_consul(base: Optional[str] = None, dc: str = "", timeout: float = 3) -> List[Service]:
+    """Global discovery: lists all services and their instances from Consul.
+
+    `timeout` bounds the whole call; per-service health lookups run concurrently
+    and stay best-effort. Raises if the catalog cannot be read or the deadline passes.
+    """
+    base = (base or consul_addr()).rstrip("/")
+    params: Dict[str, Any] = {"dc": dc} if dc else {}
+    deadline = now_ts() + timeout
+    out: List[Service] = []
+    catalog = get_json("/v1/catalog/services", params=params, base=base, timeout=timeout) or {}
+
+    def health(svc_name: str) -> list:
+        remaining = max(0.1, deadline - now_ts())
+        try:
+            return get_json(
+                f"/v1/health/service/{svc_name}",
+                params={**params, "passing": "false"},
+                base=base,
+                timeout=remaining,
+            ) or []
+        except Exception:
+            return []
+
+    # Pull instances + checks, a few services at a time
+    pool = ThreadPoolExecutor(max_workers=max(1, min(8, len(catalog))), thread_name_prefix="svcindex-consul")
+    try:
+        futures = {name: pool.submit(health, name) for name in catalog}
+        _, not_done = wait(list(futures.values()), timeout=max(0.0, deadline - now_ts()))
+        if not_done:
+            raise TimeoutError(f"consul health lookups exceeded {timeout:g}s ({len(not_done)} pending)")
+    finally:
+        pool.shutdown(wait=False, cancel_futures=True)
+
+    for svc_name, tags in catalog.items():
+        entries = futures[svc_name].result()
+
+        for e in entries:
+            service = e.get("Service") or {}
+            checks = e.get("Checks") or []
+            node = (e.get("Node") or {}).get("Node", "unknown")
+            datacenter = (e.get("Node") or {}).get("Datacenter") or dc
+            service_id = str(service.get("ID") or svc_name)
+            addr = service.get("Address") or (e.get("Node") or {}).get("Address") or ""
+            port = service.get("Port") or 0
+
+            # Determine status: passing if all checks passing (or no checks => unknown)
+            if not checks:
+                status = "unknown"
+                detail = "No checks"
+            else:
+                failing = [c for c in checks if str(c.get("Status")) != "passing"]
+                if failing:
+                    status = "failing"
+                    detail = failing[0].get("Output") or failing[0].get("CheckID") or "check failing"
+                else:
+                    status = "passing"
+                    detail = "passing"
+
+            # Monitor mode inferred from tags if present
+            tag_list = list(service.get("Tags") or tags or [])
+            mon_mode = _tag_value(tag_list, "monitor") or "none"
+            svc_type = _tag_value(tag_list, "type") or "other"
+
+            # ✅ Option A: if not monitored, show "unmonitored" unless there is a failing check
+            if mon_mode == "none" and status != "failing":
+                status = "unmonitored"
+                if detail in ("passing", "No checks"):
+                    detail = "No monitoring configured"
+
+            url = _guess_url(service.get("Meta") or {}, addr, port, svc_name)
+
+            s = Service(
+                name=f"{svc_name} @ {node}",
+                type=svc_type,
+                url=url,
+                description=(service.get("Meta") or {}).get("description", ""),
+                tags=tag_list,
+            )
+            s.monitor.mode = mon_mode
+            s.status = status
+            s.detail = str(detail)[:120]
+            # consul_sync IDs are already "<node>::<name>"; plain IDs are only unique per node
+            s.instance = service_id if service_id.startswith(f"{node}::") else f"{node}::{service_id}"
+            s.datacenter = datacenter
+            out.append(s)
+    return out
+
+def _tag_value(tags: List[str], key: str) -> str:
+    prefix = f"{key}="
+    for t in tags:
+        if isinstance(t, str) and t.startswith(prefix):
+            return t[len(prefix):]
+    return ""
+
+def _guess_url(meta: dict, addr: str, port: int, name: str) -> str:
+    # If the agent provided a URL in Meta, use it. Otherwise guess http://addr:port for nonzero port.
+    if isinstance(meta, dict):
+        u = meta.get("url")
+        if u:
+            return str(u)
+    if addr and port:
+        return f"http://{addr}:{port}"
+    return ""
@@ -4,7 +4,7 @@ import argparse
 import os
 import threading
 import time
-from typing import List, Optional
+from typing import Dict, List, Optional
 
 from flask import Flask
 
@@ -14,7 +14,8 @@ from .docker_discovery import discover_from_labels
 from .checks import check_service
 from .webapp import create_app
 from .consul_sync import sync_services_to_local_consul
-from .consul_client import get_json
+from .consul_client import consul_addr
+from .hub import HubAggregator, Source, parse_source
 
 def main():
     p = argparse.ArgumentParser(prog="svcindex")
@@ -30,7 +31,14 @@ def main():
     p.add_argument("--advertise", default="", help="Advertise address to register into Consul (defaults to best-effort local IP)")
     p.add_argument("--consul-server", default="", help="Consul server address for hub mode, e.g. http://192.168.1.10:8500")
 
+    # Hub sources (federation)
+    p.add_argument("--source", action="append", default=[], metavar="KIND:URL[#DC]",
+                   help="Hub source, repeatable: consul:http://10.0.0.1:8500[#dc2] or agent:http://nas:8080 (adds to --consul-server)")
+    p.add_argument("--source-timeout", type=float, default=5, help="Hub refresh budget per source, covering all of that source's requests (seconds, > 0)")
+
     args = p.parse_args()
+    if args.source_timeout <= 0:
+        p.error("--source-timeout must be > 0")
 
     if args.mode == "agent":
         run_agent(args)
@@ -84,105 +92,37 @@ def run_agent(args) -> None:
     app.run(host=args.listen, port=args.port, threaded=True)
 
 def run_hub(args) -> None:
-    lock = threading.Lock()
-    services: List[Service] = []
-
     if args.consul_server:
         os.environ["CONSUL_HTTP_ADDR"] = args.consul_server
 
+    try:
+        sources: List[Source] = [parse_source(spec) for spec in args.source]
+        if args.consul_server or not sources:
+            sources.insert(0, parse_source(f"consul:{consul_addr()}"))
+    except ValueError as e:
+        raise SystemExit(f"svcindex: {e}")
+    # the same source twice would share one state slot; keep the first
+    unique: Dict[str, Source] = {}
+    for src in sources:
+        unique.setdefault(src.name, src)
+    sources = list(unique.values())
+
+    hub = HubAggregator(sources, timeout=args.source_timeout)
+
     def refresh_loop():
-        nonlocal services
         while True:
-            items = discover_from_consul()
-            with lock:
-                services = items
+            hub.refresh()
             time.sleep(max(5, args.poll))
 
     t = threading.Thread(target=refresh_loop, daemon=True)
     t.start()
 
-    def get_services():
-        with lock:
-            return list(services)
-
     title = "svcindex · hub"
-    app = create_app(mode="hub", get_services=get_services, title=title, hub_consul_addr=os.getenv("CONSUL_HTTP_ADDR"))
+    app = create_app(
+        mode="hub",
+        get_services=hub.services,
+        title=title,
+        hub_consul_addr=os.getenv("CONSUL_HTTP_ADDR"),
+        get_sources=hub.states,
+    )
     app.run(host=args.listen, port=args.port, threaded=True)
-
-def discover_from_consul() -> List[Service]:
-    """Best-effort global discovery: lists all services and their instances from Consul."""
-    out: List[Service] = []
-    try:
-        catalog = get_json("/v1/catalog/services") or {}
-    except Exception:
-        return out
-
-    for svc_name, tags in catalog.items():
-        # Pull instances + checks
-        try:
-            entries = get_json(f"/v1/health/service/{svc_name}", params={"passing": "false"}) or []
-        except Exception:
-            entries = []
-
-        for e in entries:
-            service = e.get("Service") or {}
-            checks = e.get("Checks") or []
-            node = (e.get("Node") or {}).get("Node", "unknown")
-            addr = service.get("Address") or (e.get("Node") or {}).get("Address") or ""
-            port = service.get("Port") or 0
-
-            # Determine status: passing if all checks passing (or no checks => unknown)
-            if not checks:
-                status = "unknown"
-                detail = "No checks"
-            else:
-                failing = [c for c in checks if str(c.get("Status")) != "passing"]
-                if failing:
-                    status = "failing"
-                    detail = failing[0].get("Output") or failing[0].get("CheckID") or "check failing"
-                else:
-                    status = "passing"
-                    detail = "passing"
-
-        # Monitor mode inferred from tags if present
-        tag_list = list(service.get("Tags") or tags or [])
-        mon_mode = _tag_value(tag_list, "monitor") or "none"
-        svc_type = _tag_value(tag_list, "type") or "other"
-
-        # ✅ Option A: if not monitored, show "unmonitored" unless there is a failing check
-        if mon_mode == "none" and status != "failing":
-            status = "unmonitored"
-            if detail in ("passing", "No checks"):
-                detail = "No monitoring configured"
-
-            url = _guess_url(service.get("Meta") or {}, addr, port, svc_name)
-
-            s = Service(
-                name=f"{svc_name} @ {node}",
-                type=svc_type,
-                url=url,
-                description=(service.get("Meta") or {}).get("description", ""),
-                tags=tag_list,
-            )
-            s.monitor.mode = mon_mode
-            s.status = status
-            s.detail = str(detail)[:120]
-            out.append(s)
-    return out
-
-def _tag_value(tags: List[str], key: str) -> str:
-    prefix = f"{key}="
-    for t in tags:
-        if isinstance(t, str) and t.startswith(prefix):
-            return t[len(prefix):]
-    return ""
-
-def _guess_url(meta: dict, addr: str, port: int, name: str) -> str:
-    # If the agent provided a URL in Meta, use it. Otherwise guess http://addr:port for nonzero port.
-    if isinstance(meta, dict):
-        u = meta.get("url")
-        if u:
-            return str(u)
-    if addr and port:
-        return f"http://{addr}:{port}"
-    return ""
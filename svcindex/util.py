@@ -38,6 +38,12 @@ class Service:
     last_checked: float = 0.0
     latency_ms: Optional[int] = None
     detail: str = ""
+    # hub only: which source reported this service and whether that source is stale
+    source: str = ""
+    stale: bool = False
+    # hub only: "<node>::<service id>" (+ datacenter) identifies one instance across sources
+    instance: str = ""
+    datacenter: str = ""
 
 def now_ts() -> float:
     return time.time()
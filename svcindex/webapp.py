@@ -3,17 +3,20 @@ from __future__ import annotations
 import threading
 import time
 from collections import defaultdict
+from dataclasses import asdict
 from typing import Callable, Dict, List, Optional
 
 from flask import Flask, render_template, request
 
 from .util import Service, hostname, now_ts
+from .hub import SourceState
 
 def create_app(
     mode: str,
     get_services: Callable[[], List[Service]],
     title: str,
     hub_consul_addr: Optional[str] = None,
+    get_sources: Optional[Callable[[], List[SourceState]]] = None,
 ) -> Flask:
     app = Flask(__name__, template_folder="templates", static_folder="static")
 
@@ -35,10 +38,31 @@ def create_app(
             now=int(now_ts()),
             groups=sorted(groups.items(), key=lambda kv: kv[0]),
             hub_consul_addr=hub_consul_addr,
+            sources=[st.to_dict() for st in get_sources()] if get_sources else [],
         )
 
+    if mode == "agent":
+        @app.get("/api/services")
+        def api_services():
+            # JSON snapshot; hubs can aggregate agents directly via --source agent:<url>
+            return {
+                "node": hostname(),
+                "mode": mode,
+                "now": int(now_ts()),
+                "services": [asdict(s) for s in get_services()],
+            }
+
     @app.get("/healthz")
     def healthz():
-        return {"ok": True, "mode": mode}
+        out = {"ok": True, "mode": mode}
+        if not get_sources:
+            return out
+        states = get_sources()
+        # sources that have not answered yet don't count; 503 once none of the rest is fresh
+        settled = [st for st in states if not st.pending]
+        out["ok"] = not settled or any(not st.stale for st in settled)
+        out["degraded"] = any(st.stale for st in settled)
+        out["sources"] = [st.to_dict() for st in states]
+        return out, (200 if out["ok"] else 503)
 
     return app
@@ -0,0 +1,201 @@
+import threading
+import time
+
+import pytest
+
+from svcindex import hub
+from svcindex.hub import HubAggregator, Source, SourceState, parse_source
+from svcindex.util import Service
+
+
+@pytest.mark.parametrize("spec, name", [
+    ("consul:http://10.0.0.1:8500", "consul:http://10.0.0.1:8500"),
+    ("consul:http://10.0.0.1:8500/#dc2", "consul:http://10.0.0.1:8500#dc2"),
+    ("agent:http://nas:8080", "agent:http://nas:8080"),
+    ("agent:nas:8080", "agent:http://nas:8080"),
+    ("10.0.0.9:8500", "consul:http://10.0.0.9:8500"),
+    ("http://consul:8500", "consul:http://consul:8500"),
+])
+def test_parse_source_accepts(spec, name):
+    assert parse_source(spec).name == name
+
+
+@pytest.mark.parametrize("spec", [
+    "consul:8500",
+    "agent:8080",
+    "consul:",
+    "",
+    "agent:http://nas:8080#dc2",
+])
+def test_parse_source_rejects(spec):
+    with pytest.raises(ValueError):
+        parse_source(spec)
+
+
+def _svc(name, source, instance="", datacenter=""):
+    return Service(name=name, source=source, instance=instance, datacenter=datacenter)
+
+
+def _settled(agg, fresh):
+    # fill results/states directly, as if every source had answered once
+    for src in agg.sources:
+        st = agg._states[src.name]
+        st.stale = src.name not in fresh
+        st.ok = not st.stale
+        st.last_ok = 1.0
+
+
+def test_merge_keeps_instances_within_a_source():
+    a = Source("consul", "http://a:8500")
+    agg = HubAggregator([a])
+    agg._results[a.name] = [
+        _svc("web @ n1", a.name, "n1::web-1", "dc1"),
+        _svc("web @ n1", a.name, "n1::web-2", "dc1"),
+    ]
+    _settled(agg, fresh={a.name})
+    assert len(agg.services()) == 2
+
+
+def test_merge_keeps_same_node_in_different_datacenters():
+    a = Source("consul", "http://a:8500", dc="dc1")
+    b = Source("consul", "http://a:8500", dc="dc2")
+    agg = HubAggregator([a, b])
+    for src in (a, b):
+        agg._results[src.name] = [
+            _svc("web @ consul-1", src.name, "consul-1::web-1", src.dc),
+            _svc("web @ consul-1", src.name, "consul-1::web-2", src.dc),
+        ]
+    _settled(agg, fresh={a.name, b.name})
+    assert len(agg.services()) == 4
+
+
+def test_merge_collapses_overlap_and_prefers_fresh():
+    c = Source("consul", "http://a:8500")
+    c2 = Source("consul", "http://b:8500")
+    g = Source("agent", "http://n1:8080")
+    agg = HubAggregator([c, c2, g])
+    agg._results[c.name] = [_svc("grafana @ n1", c.name, "n1::grafana", "dc1")]
+    agg._results[c2.name] = [_svc("grafana @ n1", c2.name, "n1::grafana", "dc1")]
+    agg._results[g.name] = [_svc("grafana @ n1", g.name, "n1::grafana")]
+
+    _settled(agg, fresh={c.name, c2.name, g.name})
+    out = agg.services()
+    assert [(s.source, s.stale) for s in out] == [(c.name, False)]
+
+    _settled(agg, fresh={g.name})
+    out = agg.services()
+    assert [(s.source, s.stale) for s in out] == [(g.name, False)]
+
+
+def test_hung_source_goes_stale_while_others_stay_fresh(monkeypatch):
+    release = threading.Event()
+
+    def fetch(src, timeout):
+        if "hung" in src.url:
+            release.wait(5)
+        return [_svc(f"x @ {src.url}", src.name)]
+
+    monkeypatch.setattr(hub, "fetch_source", fetch)
+    good, hung = Source("consul", "http://good"), Source("consul", "http://hung")
+    agg = HubAggregator([good, hung], timeout=0.2)
+    try:
+        agg.refresh()
+        states = {st.name: st for st in agg.states()}
+        assert states[good.name].status == "ok"
+        assert states[hung.name].status == "stale"
+        assert "timed out" in states[hung.name].error
+        assert [s.source for s in agg.services()] == [good.name]
+    finally:
+        release.set()
+
+
+def test_slow_source_stays_ok(monkeypatch):
+    def fetch(src, timeout):
+        time.sleep(0.3)
+        return [_svc("x @ n1", src.name)]
+
+    monkeypatch.setattr(hub, "fetch_source", fetch)
+    src = Source("agent", "http://slow:8080")
+    agg = HubAggregator([src], timeout=0.2)
+
+    agg.refresh()
+    assert agg.states()[0].stale  # no result at all yet
+    for _ in range(3):
+        time.sleep(0.2)
+        agg.refresh()
+        st = agg.states()[0]
+        assert not st.stale and st.ok
+        assert st.age_s is not None
+
+
+def test_failure_keeps_last_good_result_marked_stale(monkeypatch):
+    calls = []
+
+    def fetch(src, timeout):
+        calls.append(src)
+        if len(calls) > 1:
+            raise RuntimeError("connection refused")
+        return [_svc("x @ n1", src.name)]
+
+    monkeypatch.setattr(hub, "fetch_source", fetch)
+    agg = HubAggregator([Source("consul", "http://a")], timeout=0.5)
+
+    assert [s.stale for s in agg.refresh()] == [False]
+    out = agg.refresh()
+    assert [(s.name, s.stale) for s in out] == [("x @ n1", True)]
+    st = agg.states()[0]
+    assert st.status == "stale" and st.error == "connection refused"
+
+
+def test_source_state_pending_until_first_answer():
+    st = SourceState(name="consul:http://a", kind="consul")
+    assert st.status == "pending"
+    st.error = "boom"
+    assert st.status == "stale"
+    assert set(st.to_dict()) == {"name", "kind", "status", "ok", "stale", "age_s", "count", "error"}
+
+
+def _health_entry(node, sid, port, status="passing", dc="dc1"):
+    return {
+        "Node": {"Node": node, "Address": "10.0.0.5", "Datacenter": dc},
+        "Service": {"ID": sid, "Port": port, "Tags": ["monitor=http", "type=docker"]},
+        "Checks": [{"Status": status, "CheckID": "c1"}],
+    }
+
+
+def test_discover_from_consul_returns_every_instance(monkeypatch):
+    def get_json(path, params=None, base=None, timeout=3):
+        if path == "/v1/catalog/services":
+            return {"web": []}
+        return [
+            _health_entry("n1", "web-1", 8001),
+            _health_entry("n1", "web-2", 8002, status="critical"),
+        ]
+
+    monkeypatch.setattr(hub, "get_json", get_json)
+    out = hub.discover_from_consul(base="http://c", timeout=1)
+    assert [(s.name, s.url, s.status, s.instance, s.datacenter) for s in out] == [
+        ("web @ n1", "http://10.0.0.5:8001", "passing", "n1::web-1", "dc1"),
+        ("web @ n1", "http://10.0.0.5:8002", "failing", "n1::web-2", "dc1"),
+    ]
+
+
+def test_discover_from_consul_deadline(monkeypatch):
+    def get_json(path, params=None, base=None, timeout=3):
+        if path == "/v1/catalog/services":
+            return {f"s{i}": [] for i in range(20)}
+        time.sleep(0.2)
+        return []
+
+    monkeypatch.setattr(hub, "get_json", get_json)
+    with pytest.raises(TimeoutError):
+        hub.discover_from_consul(base="http://c", timeout=0.3)
+
+
+def test_discover_from_consul_raises_when_catalog_unreachable(monkeypatch):
+    def get_json(path, params=None, base=None, timeout=3):
+        raise ConnectionError("refused")
+
+    monkeypatch.setattr(hub, "get_json", get_json)
+    with pytest.raises(ConnectionError):
+        hub.discover_from_consul(base="http://c", timeout=1)
@@ -0,0 +1,57 @@
+from svcindex.hub import SourceState
+from svcindex.util import Service
+from svcindex.webapp import create_app
+
+
+def _client(mode, states=None):
+    services = [Service(name="grafana", type="docker")]
+    app = create_app(
+        mode=mode,
+        get_services=lambda: services,
+        title="t",
+        get_sources=(lambda: states) if states is not None else None,
+    )
+    return app.test_client()
+
+
+def test_healthz_agent():
+    r = _client("agent").get("/healthz")
+    assert r.status_code == 200
+    assert r.get_json() == {"ok": True, "mode": "agent"}
+
+
+def test_healthz_hub_pending_is_ok():
+    r = _client("hub", [SourceState(name="consul:http://a", kind="consul")]).get("/healthz")
+    assert r.status_code == 200
+    body = r.get_json()
+    assert body["ok"] is True and body["degraded"] is False
+    assert body["sources"][0]["status"] == "pending"
+
+
+def test_healthz_hub_degraded_and_down():
+    fresh = SourceState(name="consul:http://a", kind="consul", ok=True, stale=False, last_ok=1.0, count=3)
+    failed = SourceState(name="agent:http://b", kind="agent", error="timed out after 5s")
+
+    r = _client("hub", [fresh, failed]).get("/healthz")
+    assert r.status_code == 200
+    body = r.get_json()
+    assert body["ok"] is True and body["degraded"] is True
+    assert [s["status"] for s in body["sources"]] == ["ok", "stale"]
+    assert set(body["sources"][0]) == {"name", "kind", "status", "ok", "stale", "age_s", "count", "error"}
+
+    r = _client("hub", [failed]).get("/healthz")
+    assert r.status_code == 503
+    assert r.get_json()["ok"] is False
+
+
+def test_api_services_only_in_agent_mode():
+    r = _client("agent").get("/api/services")
+    assert r.status_code == 200
+    assert r.get_json()["services"][0]["name"] == "grafana"
+    assert _client("hub", []).get("/api/services").status_code == 404
+
+
+def test_index_shows_source_status():
+    failed = SourceState(name="agent:http://b", kind="agent", error="boom")
+    html = _client("hub", [failed]).get("/").get_data(as_text=True)
+    assert "agent:http://b" in html and "stale" in html